@@ -1,3 +1,5 @@
 from .filtering import *
+from .online import *
 from .putemg_utilities import *
+from .record_index import *
 from .statistics import *
@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
 
+import inspect
+import json
+import os
 import time
+from typing import List
 
 import pandas as pd
 import numpy as np
@@ -11,7 +15,8 @@ from scipy.signal import butter, filtfilt
 from . import putemg_utilities
 
 
-__all__ = ["apply_filter"]
+__all__ = ["apply_filter", "filter_parameters", "store_filtered", "is_filtered_cached", "load_filtered",
+           "apply_filter_cached"]
 
 
 harmonic_x = lambda x, t: x[0] * np.sin(2 * np.pi * x[2] * t) + x[1] * (np.cos(2 * np.pi * x[2] * t))
@@ -40,10 +45,10 @@ def Q_jacobian_f(x, signal, t, f):
     return np.array([dx0, dx1])
 
 
-def multi_notch(series, window, notch_frequencies):
+def multi_notch(series, window, notch_frequencies, dtype=np.float64):
     windows_strided, indexes = putemg_utilities.moving_window_stride(series.values, np.int_(window), np.int_(window))
     indexes = np.append([0], indexes + 1)
-    vec = np.zeros(np.shape(series))
+    vec = np.zeros(np.shape(series), dtype=dtype)
     for freq in notch_frequencies:
         x_est = (0, 0, freq)
         i = 0
@@ -68,26 +73,151 @@ def butter_bandpass(low_cutoff, high_cutoff, fs, order=5):
     return b, a
 
 
-def butter_bandpass_filter(data, low_cutoff, high_cutoff, fs, order=5):
+def butter_bandpass_filter(data, low_cutoff, high_cutoff, fs, order=5, dtype=np.float64):
     b, a = butter_bandpass(low_cutoff, high_cutoff, fs, order=order)
     y = filtfilt(b, a, data)
-    return y
+    return y.astype(dtype, copy=False)
 
 
-def pre_process(signal, window_t=10, freq=5124.07211903, low_pass=20, high_pass=700):
-    notch_frequencies = [30, 49.99, 90, 60, 150]
-    val = multi_notch(signal, window_t * freq, notch_frequencies)
-    signal = butter_bandpass_filter(signal - val, low_pass, high_pass, freq)
+def pre_process(signal, window_t=10, freq=5124.07211903, low_pass=20, high_pass=700,
+                notch_frequencies=(30, 49.99, 90, 60, 150), order=5, dtype=np.float64):
+    # time base and harmonic fits stay in float64, only sample buffers use dtype
+    if signal.dtype != dtype:
+        signal = signal.astype(dtype)
+    val = multi_notch(signal, window_t * freq, notch_frequencies, dtype=dtype)
+    signal = butter_bandpass_filter(signal - val, low_pass, high_pass, freq, order=order, dtype=dtype)
 
     return signal
 
 
-def apply_filter(df: pd.DataFrame):
+def apply_filter(df: pd.DataFrame, **filter_args):
     start = time.time()
     columns = list(filter(lambda k: 'EMG' in k, df.columns))
     print('Processing channel: ', end='', flush=True)
     for channel_name in columns:
         print(' ' + channel_name, end='', flush=True)
-        df[channel_name] = pre_process(df[channel_name])
+        df[channel_name] = pre_process(df[channel_name], **filter_args)
     print('', flush=True)
     print("Elapsed time: {:.2f}s".format(time.time() - start))
+
+
+def filter_parameters(**filter_args):
+    """
+    Returns complete set of pre_process parameters, defaults overridden with given arguments, in JSON compatible form
+    :param filter_args: pre_process keyword arguments
+    :return: Dict - parameter name to value
+    """
+    parameters = {k: v.default for k, v in inspect.signature(pre_process).parameters.items()
+                  if v.default is not inspect.Parameter.empty}
+    for k in filter_args:
+        if k not in parameters:
+            raise ValueError(k + ' is not a valid filter parameter')
+    parameters.update(filter_args)
+    parameters = {k: v.item() if isinstance(v, np.generic) else v for k, v in parameters.items()}
+    parameters["notch_frequencies"] = [float(f) for f in parameters["notch_frequencies"]]
+    parameters["dtype"] = np.dtype(parameters["dtype"]).name
+    return parameters
+
+
+def store_filtered(df: pd.DataFrame, cache_dir: str, **filter_args):
+    """
+    Stores filtered EMG channels of df in cache directory, as one contiguous .npy file per channel, together with
+    index and filter parameters. Parameters file is written last and atomically replaced, so interrupted store
+    leaves no valid cache.
+    :param df: pandas.DataFrame - data processed with apply_filter(df, **filter_args)
+    :param cache_dir: str - cache directory of single record
+    :param filter_args: pre_process keyword arguments used for filtering
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    meta_path = os.path.join(cache_dir, "filter.json")
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    columns = list(filter(lambda k: 'EMG' in k, df.columns))
+    np.save(os.path.join(cache_dir, "index.npy"), np.ascontiguousarray(df.index.values))
+    for channel_name in columns:
+        np.save(os.path.join(cache_dir, channel_name + ".npy"), np.ascontiguousarray(df[channel_name].values))
+
+    meta = {"parameters": filter_parameters(**filter_args), "channels": columns, "length": len(df.index)}
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(meta_path + ".tmp", meta_path)
+
+
+def is_filtered_cached(cache_dir: str, length: int = None, index: np.ndarray = None, channels: List[str] = None,
+                       **filter_args):
+    """
+    Checks if cache directory holds complete data filtered with given parameters
+    :param cache_dir: str - cache directory of single record
+    :param length: int - expected number of samples, not checked if None
+    :param index: numpy.ndarray - expected index values, not checked if None
+    :param channels: List[str] - expected stored channels, not checked if None
+    :param filter_args: pre_process keyword arguments
+    :return: bool - True if cache is valid
+    """
+    parameters = filter_parameters(**filter_args)
+    try:
+        with open(os.path.join(cache_dir, "filter.json")) as f:
+            meta = json.load(f)
+        if meta["parameters"] != parameters:
+            return False
+        if length is not None and meta["length"] != length:
+            return False
+        if channels is not None and list(channels) != meta["channels"]:
+            return False
+        for channel_name in meta["channels"]:
+            if not os.path.isfile(os.path.join(cache_dir, channel_name + ".npy")):
+                return False
+        cached_index = np.load(os.path.join(cache_dir, "index.npy"), mmap_mode='r')
+        if len(cached_index) != meta["length"]:
+            return False
+        return index is None or np.array_equal(cached_index, index)
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        return False
+
+
+def load_filtered(cache_dir: str, channels: List[str] = None, start=None, stop=None, **filter_args):
+    """
+    Opens filtered channels from cache as read-only memory-mapped arrays, no data is copied
+    :param cache_dir: str - cache directory of single record
+    :param channels: List[str] - channels to open, all stored channels if None
+    :param start: index value of first sample (inclusive), beginning of record if None
+    :param stop: index value of last sample (exclusive), end of record if None
+    :param filter_args: pre_process keyword arguments, cache is rejected if stored with different ones
+    :return: index: numpy.ndarray - index values, data: Dict[str, numpy.ndarray] - channel name to samples
+    """
+    if not is_filtered_cached(cache_dir, **filter_args):
+        raise ValueError("No valid filtered cache in " + cache_dir)
+    with open(os.path.join(cache_dir, "filter.json")) as f:
+        meta = json.load(f)
+    if channels is None:
+        channels = meta["channels"]
+
+    index = np.load(os.path.join(cache_dir, "index.npy"), mmap_mode='r')
+    i_start = 0 if start is None else np.searchsorted(index, start, side='left')
+    i_stop = len(index) if stop is None else np.searchsorted(index, stop, side='left')
+
+    data = {}
+    for channel_name in channels:
+        if channel_name not in meta["channels"]:
+            raise KeyError(channel_name)
+        data[channel_name] = np.load(os.path.join(cache_dir, channel_name + ".npy"), mmap_mode='r')[i_start:i_stop]
+    return index[i_start:i_stop], data
+
+
+def apply_filter_cached(df: pd.DataFrame, cache_dir: str, **filter_args):
+    """
+    Same as apply_filter, but reads filtered channels from cache directory if it holds data of the same index and
+    channels filtered with the same parameters, otherwise filters df and (re)writes the cache
+    :param df: pandas.DataFrame - raw data, EMG channels are replaced with filtered ones
+    :param cache_dir: str - cache directory of single record
+    :param filter_args: pre_process keyword arguments
+    """
+    columns = list(filter(lambda k: 'EMG' in k, df.columns))
+    if is_filtered_cached(cache_dir, length=len(df.index), index=df.index.values, channels=columns, **filter_args):
+        _, data = load_filtered(cache_dir, **filter_args)
+        for channel_name, values in data.items():
+            df[channel_name] = values
+    else:
+        apply_filter(df, **filter_args)
+        store_filtered(df, cache_dir, **filter_args)
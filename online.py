@@ -0,0 +1,327 @@
+import re
+import time
+from abc import ABC, abstractmethod
+from typing import List
+
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+__all__ = ["IncrementalFeature", "FeatureRMS", "FeatureMAV", "FeatureWL", "OnlineRecognizer"]
+
+
+class IncrementalFeature(ABC):
+    """
+    Per-channel feature of moving window, updated from samples entering and leaving the window instead of
+    being recomputed over the whole window. All buffers are allocated in allocate, updates do not allocate.
+    Feature name is used to match pipeline input columns, see prepare_data.
+    """
+    name: str = ""
+
+    def allocate(self, window: int, channels: int, dtype=np.float64):
+        """
+        Preallocates state and scratch buffers
+        :param window: int - window size
+        :param channels: int - number of channels
+        :param dtype: sample data type
+        """
+        self.window = window
+        self._sum = np.zeros(channels, dtype=np.float64)
+        self._tmp = np.zeros(channels, dtype=dtype)
+        self._scratch = np.zeros((window, channels), dtype=dtype)
+
+    @abstractmethod
+    def reset(self, window: np.ndarray):
+        """
+        Computes state from scratch
+        :param window: numpy.ndarray - (window, channels) samples of current window
+        """
+
+    @abstractmethod
+    def update(self, entering: np.ndarray, leaving: np.ndarray):
+        """
+        Moves window by step samples
+        :param entering: numpy.ndarray - (step + 1, channels) last sample of previous window and new samples
+        :param leaving: numpy.ndarray - (step + 1, channels) removed samples and first sample of current window
+        """
+
+    def value(self, out: np.ndarray):
+        """
+        Writes feature value of current window
+        :param out: numpy.ndarray - (channels,) output
+        """
+        np.divide(self._sum, self.window, out=out)
+
+
+class FeatureRMS(IncrementalFeature):
+    name = "RMS"
+
+    def allocate(self, window: int, channels: int, dtype=np.float64):
+        super().allocate(window, channels, dtype)
+        self._mean = np.zeros(channels, dtype=np.float64)
+
+    def _sum_squares(self, block, sign):
+        np.einsum('ij,ij->j', block, block, out=self._tmp)
+        if sign > 0:
+            self._sum += self._tmp
+        else:
+            self._sum -= self._tmp
+
+    def reset(self, window: np.ndarray):
+        self._sum[:] = 0
+        self._sum_squares(window, 1)
+
+    def update(self, entering: np.ndarray, leaving: np.ndarray):
+        self._sum_squares(entering[1:], 1)
+        self._sum_squares(leaving[:-1], -1)
+
+    def value(self, out: np.ndarray):
+        # running sum may drift slightly below zero between resyncs
+        np.divide(self._sum, self.window, out=self._mean)
+        np.maximum(self._mean, 0, out=self._mean)
+        np.sqrt(self._mean, out=out)
+
+
+class FeatureMAV(IncrementalFeature):
+    name = "MAV"
+
+    def _sum_abs(self, block, sign):
+        scratch = self._scratch[:len(block)]
+        np.abs(block, out=scratch)
+        scratch.sum(axis=0, out=self._tmp)
+        if sign > 0:
+            self._sum += self._tmp
+        else:
+            self._sum -= self._tmp
+
+    def reset(self, window: np.ndarray):
+        self._sum[:] = 0
+        self._sum_abs(window, 1)
+
+    def update(self, entering: np.ndarray, leaving: np.ndarray):
+        self._sum_abs(entering[1:], 1)
+        self._sum_abs(leaving[:-1], -1)
+
+
+class FeatureWL(IncrementalFeature):
+    name = "WL"
+
+    def _sum_abs_diff(self, block, sign):
+        scratch = self._scratch[:len(block) - 1]
+        np.subtract(block[1:], block[:-1], out=scratch)
+        np.abs(scratch, out=scratch)
+        scratch.sum(axis=0, out=self._tmp)
+        if sign > 0:
+            self._sum += self._tmp
+        else:
+            self._sum -= self._tmp
+
+    def reset(self, window: np.ndarray):
+        self._sum[:] = 0
+        self._sum_abs_diff(window, 1)
+
+    def update(self, entering: np.ndarray, leaving: np.ndarray):
+        self._sum_abs_diff(entering, 1)
+        self._sum_abs_diff(leaving, -1)
+
+    def value(self, out: np.ndarray):
+        out[:] = self._sum
+
+
+class OnlineRecognizer:
+    """
+    Real-time gesture recognition with fitted pipeline (see prepare_pipeline). Incoming samples are kept in
+    preallocated buffer, windows are formed with the same semantics as moving_window_stride, features are
+    updated incrementally and decisions are smoothed with causal version of filter_smart median/idle filtering.
+
+    Pushed samples must already be filtered the same way as training data. apply_filter uses non-causal filtfilt,
+    so raw samples will not match models trained on its output, a causal filter has to be used in both paths.
+
+    Feature vector is arranged in pipeline input column order. Columns named as prepare_data output
+    ("input_<i>_<FEATURE>_<channel>" or "<FEATURE>_<channel>") are taken from columns argument or from
+    pipeline.feature_names_in_ and matched against feature names and channel_numbers. Without any column names
+    feature-major order is assumed (all channels of features[0], then features[1], ...).
+    """
+    _column_regex = re.compile(r"^(?:input_[0-9]+_)?([A-Z]+)_([0-9]+)$")
+
+    def __init__(self, pipeline: Pipeline, features: List[IncrementalFeature], channels: int,
+                 window: int, step: int, max_block: int = None,
+                 columns: List[str] = None, channel_numbers: List[int] = None,
+                 recognition_median_filter: int = 5, min_idle_period: int = 7,
+                 resync_interval: int = 1000, latency_history: int = 10000, latency_budget: float = None,
+                 dtype=np.float64):
+        """
+        :param pipeline: Pipeline - fitted classifier pipeline
+        :param features: List[IncrementalFeature] - features in pipeline input order
+        :param channels: int - number of EMG channels
+        :param window: int - window size
+        :param step: int - step length
+        :param max_block: int - maximum number of samples passed to single push, window if None
+        :param columns: List[str] - pipeline input column names, pipeline.feature_names_in_ if None
+        :param channel_numbers: List[int] - channel numbers used in column names, 1..channels if None
+        :param recognition_median_filter: int - median filter length in decisions, as in filter_smart
+        :param min_idle_period: int - minimal idle period in decisions, as in filter_smart
+        :param resync_interval: int - number of windows after which features are recomputed from scratch
+        :param latency_history: int - number of latest per-window latencies kept for reporting
+        :param latency_budget: float - per-window latency budget in seconds, exceeding windows are counted
+        :param dtype: sample and feature data type
+        """
+        if max_block is None:
+            max_block = window
+
+        self.pipeline = pipeline
+        self.features = features
+        self.channels = channels
+        self.window = window
+        self.step = step
+        self.max_block = max_block
+        self.resync_interval = resync_interval
+        self.latency_budget = latency_budget
+
+        for f in features:
+            f.allocate(window, channels, dtype)
+
+        self._keep = window + step
+        self._buffer = np.zeros((2 * self._keep + max_block, channels), dtype=dtype)
+        self._scratch = np.zeros((self._keep, channels), dtype=dtype)
+        self._values = np.zeros(len(features) * channels, dtype=dtype)
+        self._x = np.zeros((1, len(features) * channels), dtype=dtype)
+        self._order = self._column_order(pipeline, columns, channel_numbers)
+        # pipelines fitted on DataFrames get a DataFrame sharing memory with feature vector, no per-window copy
+        pipeline_columns = getattr(pipeline, "feature_names_in_", None)
+        if pipeline_columns is not None:
+            self._input = pd.DataFrame(self._x, columns=pipeline_columns, copy=False)
+        else:
+            self._input = self._x
+        self._decisions = np.zeros(max_block // step + 1, dtype=np.int32)
+
+        self._labels = np.zeros(recognition_median_filter, dtype=np.int32)
+        self._labels_sorted = np.zeros(recognition_median_filter, dtype=np.int32)
+        self._min_idle_run = 2 * int(min_idle_period / 2) + 1
+
+        self._latency = np.zeros(latency_history, dtype=np.int64)
+
+        self.reset()
+
+    def _column_order(self, pipeline, columns, channel_numbers):
+        if columns is None:
+            columns = getattr(pipeline, "feature_names_in_", None)
+        if columns is None:
+            return np.arange(len(self.features) * self.channels)
+        if channel_numbers is None:
+            channel_numbers = list(range(1, self.channels + 1))
+        if len(channel_numbers) != self.channels:
+            raise ValueError("Expected {:d} channel numbers, got {:d}".format(self.channels, len(channel_numbers)))
+
+        positions = {(f.name, c): j * self.channels + k
+                     for j, f in enumerate(self.features) for k, c in enumerate(channel_numbers)}
+        order = []
+        for column in columns:
+            tags = self._column_regex.match(str(column))
+            key = (tags.group(1), int(tags.group(2))) if tags else None
+            if key not in positions:
+                raise ValueError("Pipeline input column " + str(column) + " does not match any feature and channel")
+            order.append(positions.pop(key))
+        if positions:
+            raise ValueError("Features not used by pipeline: " +
+                             ", ".join("{:s}_{:d}".format(*k) for k in sorted(positions)))
+        return np.array(order, dtype=np.intp)
+
+    def reset(self):
+        """
+        Clears buffered samples, smoothing state and latency statistics
+        """
+        self._end = 0
+        self._next = self.window
+        self.windows = 0
+        self.overruns = 0
+        self._labels[:] = 0
+        self._idle_run = 0
+        self._output = 0
+
+    def push(self, samples: np.ndarray):
+        """
+        Appends samples and processes all windows completed by them
+        :param samples: numpy.ndarray - (n, channels) new samples, n <= max_block
+        :return: numpy.ndarray - smoothed decisions of completed windows, view valid until next push
+        """
+        n = len(samples)
+        if n > self.max_block:
+            raise ValueError("Block of {:d} samples exceeds max_block={:d}".format(n, self.max_block))
+
+        if self._end + n > len(self._buffer):
+            keep = min(self._end, self._keep)
+            offset = self._end - keep
+            self._scratch[:keep] = self._buffer[offset:self._end]
+            self._buffer[:keep] = self._scratch[:keep]
+            self._end = keep
+            self._next -= offset
+
+        self._buffer[self._end:self._end + n] = samples
+        self._end += n
+
+        count = 0
+        while self._next <= self._end:
+            self._decisions[count] = self._process(self._next)
+            self._next += self.step
+            count += 1
+        return self._decisions[:count]
+
+    def _process(self, e: int):
+        start = time.perf_counter_ns()
+
+        if self.windows % self.resync_interval == 0 or self.step >= self.window:
+            for f in self.features:
+                f.reset(self._buffer[e - self.window:e])
+        else:
+            entering = self._buffer[e - self.step - 1:e]
+            leaving = self._buffer[e - self.window - self.step:e - self.window + 1]
+            for f in self.features:
+                f.update(entering, leaving)
+
+        for j, f in enumerate(self.features):
+            f.value(self._values[j * self.channels:(j + 1) * self.channels])
+        np.take(self._values, self._order, out=self._x[0], mode='clip')
+
+        recognized = int(self.pipeline.predict(self._input)[0])
+        decision = self._smooth(recognized)
+
+        latency = time.perf_counter_ns() - start
+        self._latency[self.windows % len(self._latency)] = latency
+        if self.latency_budget is not None and latency > self.latency_budget * 1e9:
+            self.overruns += 1
+        self.windows += 1
+        return decision
+
+    def _smooth(self, recognized: int):
+        # median over latest decisions, zero initialised as medfilt zero pads
+        self._labels[self.windows % len(self._labels)] = recognized
+        self._labels_sorted[:] = self._labels
+        self._labels_sorted.sort()
+        recognized_median = self._labels_sorted[len(self._labels_sorted) // 2]
+
+        if recognized_median <= 0:
+            self._idle_run += 1
+        else:
+            self._idle_run = 0
+
+        # idle is confirmed only after whole opening length, shorter gaps keep previous gesture
+        if self._idle_run >= self._min_idle_run:
+            self._output = 0
+        elif recognized_median > 0:
+            self._output = recognized_median
+
+        if recognized < 0:
+            return recognized
+        return self._output
+
+    def latency_percentiles(self, percentiles=(50, 90, 99, 99.9)):
+        """
+        Returns per-window processing latency percentiles over latest windows
+        :param percentiles: percentiles to compute
+        :return: Dict - percentile to latency in seconds
+        """
+        latency = self._latency[:min(self.windows, len(self._latency))]
+        if len(latency) == 0:
+            return {p: np.nan for p in percentiles}
+        return {p: v * 1e-9 for p, v in zip(percentiles, np.percentile(latency, percentiles))}
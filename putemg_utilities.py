@@ -6,6 +6,7 @@ from typing import List, Dict, Sized
 from scipy.special import comb
 from scipy.ndimage.morphology import binary_dilation, binary_erosion
 from scipy.signal import medfilt
+from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
 
@@ -26,7 +27,7 @@ __all__ = ["convert_types_in_dict", "moving_window_stride", "window_trapezoidal"
            "Record", "split", "record_filter", "filter_transitions", "filter_smart", "filter_recognition",
            "vgg_filter",
            "data_per_id", "data_per_id_and_date", "all_data_per_id", "prepare_data", "prepare_force_data",
-           "normalized_confusion_matrix", "plot_confusion_matrix", "StandardScalerPerFeature",
+           "normalized_confusion_matrix", "plot_confusion_matrix", "CastTransformer", "StandardScalerPerFeature",
            "prepare_pipeline", "normalise_force_data"]
 
 
@@ -41,7 +42,7 @@ def convert_types_in_dict(xml_dict):
     for el in xml_dict:
         try:
             out[el] = ast.literal_eval(xml_dict[el])
-        except ValueError:
+        except (ValueError, SyntaxError):
             out[el] = xml_dict[el]
 
     return out
@@ -85,7 +86,7 @@ class Record:
         self.trajectory: str = ""
         self.date: str = ""
         self.time: str = ""
-        if str:
+        if path:
             self.set_path(path)
 
     def set_path(self, path: str):
@@ -392,7 +393,8 @@ def all_data_per_id(records: List[Record]):
     return sets
 
 
-def prepare_data(dfs: Dict[Record, pd.DataFrame], s: Dict[str, List[Record]], features: List[str], gestures: List[int]):
+def prepare_data(dfs: Dict[Record, pd.DataFrame], s: Dict[str, List[Record]], features: List[str], gestures: List[int],
+                 dtype=np.float64):
     metadata = ['TRAJ_1', 'type', 'subject', 'trajectory', 'date_time', 'TRAJ_GT', 'VIDEO_STAMP']
 
     dfs_output: Dict[str, pd.DataFrame] = dict()
@@ -405,6 +407,8 @@ def prepare_data(dfs: Dict[Record, pd.DataFrame], s: Dict[str, List[Record]], fe
             columns_input = list(filter(column_regex.match, list(dfs[r])))
             df_temp = df_temp.append(dfs[r][columns_input + metadata])
 
+        df_temp[columns_input] = df_temp[columns_input].astype(dtype)
+
         df_temp["original_time"] = df_temp.index
 
         # label filtering deprecated as labeling vgg labels are already filtered
@@ -425,7 +429,8 @@ def prepare_data(dfs: Dict[Record, pd.DataFrame], s: Dict[str, List[Record]], fe
 
 
 def prepare_force_data(dfs: Dict[Record, pd.DataFrame], s: Dict[str, List[Record]],
-                       features: List[str], force_feature: str, trajectory: List[int]):
+                       features: List[str], force_feature: str, trajectory: List[int],
+                       dtype=np.float64):
     dfs_output: Dict[str, Dict[str, pd.DataFrame]] = dict()
 
     emg_feature_column_regex = re.compile("^((" + ")|(".join(features) + "))_[0-9]+")
@@ -446,6 +451,8 @@ def prepare_force_data(dfs: Dict[Record, pd.DataFrame], s: Dict[str, List[Record
             dfs_output[data_type]["output"] = dfs_output[data_type]["output"].append(
                 dfs[record][force_feature_columns_output])
 
+        dfs_output[data_type]["input"] = dfs_output[data_type]["input"].astype(dtype)
+
         dfs_output[data_type]["input"].index = np.arange(0, len(dfs_output[data_type]["input"].index))
         dfs_output[data_type]["output"].index = np.arange(0, len(dfs_output[data_type]["output"].index))
 
@@ -511,6 +518,28 @@ def plot_confusion_matrix(cm, classes,
     return ax
 
 
+class CastTransformer(BaseEstimator, TransformerMixin):
+    """
+    Pipeline step casting input to given dtype, DataFrame columns are preserved
+    """
+
+    def __init__(self, dtype=np.float64):
+        self.dtype = dtype
+
+    def fit(self, X, y=None):
+        if hasattr(X, "columns"):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        elif hasattr(self, "feature_names_in_"):
+            del self.feature_names_in_
+        self.n_features_in_ = np.shape(X)[1]
+        return self
+
+    def transform(self, X):
+        if hasattr(X, "columns"):
+            return X.astype(self.dtype)
+        return np.asarray(X, dtype=self.dtype)
+
+
 class StandardScalerPerFeature(StandardScaler):
 
     def fit(self, X: pd.DataFrame, y=None):
@@ -527,7 +556,7 @@ class StandardScalerPerFeature(StandardScaler):
 
 
 def prepare_pipeline(train_in: pd.DataFrame, train_out: pd.DataFrame,
-                     predictor: str, norm_per_feature: bool = False,
+                     predictor: str, norm_per_feature: bool = False, dtype=np.float64,
                      **predictor_args):
 
     if norm_per_feature:
@@ -559,7 +588,10 @@ def prepare_pipeline(train_in: pd.DataFrame, train_out: pd.DataFrame,
     else:
         raise ValueError(predictor + ' is not a valid predictor')
 
-    pipe = Pipeline([('scaler', scaler), ('predictor', predictor_instance)])
+    steps = [('scaler', scaler), ('predictor', predictor_instance)]
+    if np.dtype(dtype) != np.float64:
+        steps.insert(0, ('dtype', CastTransformer(dtype)))
+    pipe = Pipeline(steps)
 
     pipe.fit(train_in, train_out)
 
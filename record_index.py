@@ -0,0 +1,153 @@
+import ast
+import os
+import sqlite3
+import warnings
+import xml.etree.ElementTree as ET
+from typing import List, Dict
+
+from .putemg_utilities import Record, convert_types_in_dict
+
+
+__all__ = ["read_xml_metadata", "RecordIndex"]
+
+
+def read_xml_metadata(path: str):
+    """
+    Reads flat XML sidecar file into dictionary of converted values, see convert_types_in_dict
+    :param path: str - path to XML file
+    :return: Dict - Dictionary with converted values
+    """
+    root = ET.parse(path).getroot()
+    return convert_types_in_dict({el.tag: el.text for el in root})
+
+
+class RecordIndex:
+    """
+    Persistent SQLite index of dataset records and their XML sidecar metadata. Records are parsed once and
+    re-parsed only when file modification time or size changes, queries do not touch dataset directory.
+    Metadata is stored as Python literal repr and read back with ast.literal_eval, so no code is executed when
+    opening index files of unknown origin.
+    """
+    _record_fields = ["type", "id", "trajectory", "date", "time"]
+    _schema_version = 2
+
+    def __init__(self, index_path: str):
+        self.index_path: str = index_path
+        self.connection = sqlite3.connect(index_path)
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != self._schema_version:
+            self.connection.execute("DROP TABLE IF EXISTS records")
+            self.connection.execute("PRAGMA user_version = {:d}".format(self._schema_version))
+        self.connection.execute("CREATE TABLE IF NOT EXISTS records ("
+                                "path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, "
+                                "type TEXT, id TEXT, trajectory TEXT, date TEXT, time TEXT, "
+                                "xml_path TEXT, xml_mtime INTEGER, metadata TEXT)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS records_id_date ON records (id, date, trajectory)")
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def update(self, directory: str, extension: str = ".hdf5", xml_extension: str = ".xml"):
+        """
+        Incrementally updates index with records found in directory, only new or changed files are parsed.
+        Entries of files no longer present in directory are removed. Records with malformed XML sidecar are skipped
+        with a warning and removed from index until the sidecar is fixed.
+        :param directory: str - dataset directory
+        :param extension: str - extension of record files
+        :param xml_extension: str - extension of metadata sidecar files, sharing base name with record
+        :return: int - number of (re)parsed records
+        """
+        directory = os.path.abspath(directory)
+        known = {row[0]: row[1:] for row in self.connection.execute("SELECT path, mtime, size, xml_mtime FROM records")
+                 if os.path.dirname(row[0]) == directory}
+        present = set()
+        parsed = 0
+
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if not entry.is_file() or not entry.name.endswith(extension):
+                        continue
+                    stat = entry.stat()
+                    xml_path = entry.path[:-len(extension)] + xml_extension
+                    try:
+                        xml_mtime = os.stat(xml_path).st_mtime_ns
+                    except FileNotFoundError:
+                        xml_path, xml_mtime = None, None
+
+                    present.add(entry.path)
+                    if known.get(entry.path) == (stat.st_mtime_ns, stat.st_size, xml_mtime):
+                        continue
+
+                    try:
+                        r = Record(entry.path)
+                    except Warning:
+                        continue
+
+                    try:
+                        metadata = read_xml_metadata(xml_path) if xml_path is not None else None
+                    except ET.ParseError as e:
+                        warnings.warn("Skipping record with malformed metadata {:s}: {:s}".format(xml_path, str(e)))
+                        present.remove(entry.path)
+                        continue
+
+                    self.connection.execute("INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                            (entry.path, stat.st_mtime_ns, stat.st_size,
+                                             r.type, r.id, r.trajectory, r.date, r.time, xml_path, xml_mtime,
+                                             repr(metadata) if metadata is not None else None))
+                    parsed += 1
+
+            removed = [(p,) for p in known.keys() if p not in present]
+            self.connection.executemany("DELETE FROM records WHERE path = ?", removed)
+        except BaseException:
+            self.connection.rollback()
+            raise
+        self.connection.commit()
+        return parsed
+
+    def records(self, whitelists: Dict[str, List] = None, blacklists: Dict[str, List] = None) -> List[Record]:
+        """
+        Returns indexed records, filtered with the same semantics as record_filter
+        :param whitelists: Dict[str, List] - Record field name to list of accepted values
+        :param blacklists: Dict[str, List] - Record field name to list of rejected values
+        :return: List[Record] - matching records ordered by path
+        """
+        conditions = []
+        arguments = []
+        for lists, operator in ((whitelists, "IN"), (blacklists, "NOT IN")):
+            for key, values in (lists or {}).items():
+                if key not in self._record_fields:
+                    raise ValueError(key + ' is not a valid record field')
+                conditions.append("{:s} {:s} ({:s})".format(key, operator, ", ".join("?" * len(values))))
+                arguments.extend(values)
+
+        query = "SELECT path, " + ", ".join(self._record_fields) + " FROM records"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY path"
+
+        records: List[Record] = []
+        for row in self.connection.execute(query, arguments):
+            r = Record()
+            r.path = row[0]
+            for key, value in zip(self._record_fields, row[1:]):
+                setattr(r, key, value)
+            records.append(r)
+        return records
+
+    def metadata(self, record: Record):
+        """
+        Returns converted XML metadata of record, without reading the sidecar file
+        :param record: Record - indexed record
+        :return: Dict - Dictionary with converted values, None if record has no sidecar
+        """
+        row = self.connection.execute("SELECT metadata FROM records WHERE path = ?", (record.path,)).fetchone()
+        if row is None:
+            raise KeyError(record.path)
+        return ast.literal_eval(row[0]) if row[0] is not None else None
@@ -0,0 +1,117 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ..filtering import (apply_filter, apply_filter_cached, filter_parameters, is_filtered_cached, load_filtered,
+                         pre_process, store_filtered)
+
+
+FS = 5124.07211903
+
+
+@pytest.fixture
+def emg():
+    rng = np.random.RandomState(0)
+    t = np.arange(int(2 * FS)) / FS
+    return pd.DataFrame({"EMG_1": rng.standard_normal(len(t)) + np.sin(2 * np.pi * 49.99 * t),
+                         "EMG_2": rng.standard_normal(len(t)),
+                         "TRAJ_1": np.zeros(len(t))}, index=t)
+
+
+def test_filter_parameters_accepts_numpy_scalars():
+    parameters = filter_parameters(window_t=np.int64(1), low_pass=np.float32(20), dtype=np.float32)
+    assert parameters["window_t"] == 1 and type(parameters["window_t"]) is int
+    assert type(parameters["low_pass"]) is float
+    assert parameters["dtype"] == "float32"
+    with pytest.raises(ValueError):
+        filter_parameters(window=1)
+
+
+def test_cache_roundtrip_and_invalidation(emg, tmp_path):
+    cache_dir = str(tmp_path)
+    filtered = emg.copy()
+    apply_filter_cached(filtered, cache_dir, window_t=np.int64(1))
+
+    assert is_filtered_cached(cache_dir, length=len(emg.index), window_t=1)
+    assert not is_filtered_cached(cache_dir, length=len(emg.index) + 1, window_t=1)
+    assert not is_filtered_cached(cache_dir, window_t=2)
+    assert not is_filtered_cached(cache_dir, window_t=1, dtype=np.float32)
+
+    cached = emg.copy()
+    apply_filter_cached(cached, cache_dir, window_t=1)
+    pd.testing.assert_frame_equal(cached, filtered)
+
+    index, data = load_filtered(cache_dir, channels=["EMG_2"], start=0.5, stop=1.0, window_t=1)
+    mask = (emg.index.values >= 0.5) & (emg.index.values < 1.0)
+    assert isinstance(data["EMG_2"], np.memmap)
+    np.testing.assert_array_equal(index, emg.index.values[mask])
+    np.testing.assert_array_equal(data["EMG_2"], filtered["EMG_2"].values[mask])
+
+    with pytest.raises(ValueError):
+        load_filtered(cache_dir, window_t=2)
+
+
+def test_broken_metadata_is_not_cached(emg, tmp_path):
+    cache_dir = str(tmp_path)
+    with open(os.path.join(cache_dir, "filter.json"), "w") as f:
+        f.write('{"parameters": {"window_t": ')
+    assert not is_filtered_cached(cache_dir, window_t=1)
+
+    filtered = emg.copy()
+    apply_filter(filtered, window_t=1)
+    store_filtered(filtered, cache_dir, window_t=1)
+    assert is_filtered_cached(cache_dir, window_t=1)
+    assert not os.path.exists(os.path.join(cache_dir, "filter.json.tmp"))
+
+
+def test_pre_process_float32_matches_float64(emg):
+    filtered_64 = pre_process(emg["EMG_1"], window_t=1)
+    filtered_32 = pre_process(emg["EMG_1"], window_t=1, dtype=np.float32)
+
+    assert filtered_32.dtype == np.float32
+    assert np.max(np.abs(filtered_32 - filtered_64)) / np.max(np.abs(filtered_64)) < 1e-5
+
+
+def test_apply_filter_float32(emg):
+    filtered_64 = emg.copy()
+    apply_filter(filtered_64, window_t=1)
+    filtered_32 = emg.copy()
+    apply_filter(filtered_32, window_t=1, dtype=np.float32)
+
+    for channel_name in ["EMG_1", "EMG_2"]:
+        assert filtered_32[channel_name].dtype == np.float32
+        np.testing.assert_allclose(filtered_32[channel_name].values, filtered_64[channel_name].values,
+                                   rtol=0, atol=1e-5 * np.max(np.abs(filtered_64[channel_name].values)))
+    assert filtered_32["TRAJ_1"].dtype == np.float64
+
+
+def test_cache_of_other_recording_is_not_reused(emg, tmp_path):
+    cache_dir = str(tmp_path)
+    apply_filter_cached(emg.copy(), cache_dir, window_t=1)
+
+    other = emg.copy()
+    other.index = other.index + 10.0
+    other["EMG_1"] = other["EMG_1"] * 2
+    assert not is_filtered_cached(cache_dir, index=other.index.values, window_t=1)
+
+    filtered = other.copy()
+    apply_filter_cached(filtered, cache_dir, window_t=1)
+    expected = other.copy()
+    apply_filter(expected, window_t=1)
+    pd.testing.assert_frame_equal(filtered, expected)
+    assert is_filtered_cached(cache_dir, index=other.index.values, window_t=1)
+
+
+def test_missing_channel_file_is_cache_miss(emg, tmp_path):
+    cache_dir = str(tmp_path)
+    filtered = emg.copy()
+    apply_filter_cached(filtered, cache_dir, window_t=1)
+    os.remove(os.path.join(cache_dir, "EMG_2.npy"))
+    assert not is_filtered_cached(cache_dir, window_t=1)
+
+    refiltered = emg.copy()
+    apply_filter_cached(refiltered, cache_dir, window_t=1)
+    pd.testing.assert_frame_equal(refiltered, filtered)
+    assert os.path.exists(os.path.join(cache_dir, "EMG_2.npy"))
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ..online import FeatureMAV, FeatureRMS, FeatureWL, IncrementalFeature, OnlineRecognizer
+from ..putemg_utilities import moving_window_stride, prepare_pipeline
+
+
+class LabelSequence:
+    """Fake fitted pipeline returning predefined decisions and recording feature vectors"""
+
+    def __init__(self, labels=None):
+        self.labels = list(labels) if labels is not None else []
+        self.inputs = []
+
+    def predict(self, X):
+        self.inputs.append(X[0].copy())
+        return np.array([self.labels[len(self.inputs) - 1] if self.labels else 0])
+
+
+def _reference_features(x, window, step):
+    features = {"RMS": [], "MAV": [], "WL": []}
+    for c in range(x.shape[1]):
+        w, _ = moving_window_stride(np.ascontiguousarray(x[:, c], dtype=np.float64), window, step)
+        features["RMS"].append(np.sqrt(np.mean(np.square(w), axis=1)))
+        features["MAV"].append(np.mean(np.abs(w), axis=1))
+        features["WL"].append(np.sum(np.abs(np.diff(w, axis=1)), axis=1))
+    return np.concatenate([np.stack(features[f], axis=1) for f in ["RMS", "MAV", "WL"]], axis=1)
+
+
+def _push_random_blocks(recognizer, x, rng, max_block):
+    decisions = []
+    i = 0
+    while i < len(x):
+        n = rng.randint(1, max_block + 1)
+        decisions.extend(recognizer.push(x[i:i + n]).tolist())
+        i += n
+    return decisions
+
+
+@pytest.mark.parametrize("window,step,resync_interval", [(100, 25, 50), (100, 25, 7), (64, 64, 1000), (40, 60, 1000)])
+@pytest.mark.parametrize("dtype,tolerance", [(np.float64, 1e-10), (np.float32, 1e-5)])
+def test_incremental_features_match_full_windows(window, step, resync_interval, dtype, tolerance):
+    rng = np.random.RandomState(0)
+    x = rng.standard_normal((3000, 4)).astype(dtype)
+    pipeline = LabelSequence()
+    recognizer = OnlineRecognizer(pipeline, [FeatureRMS(), FeatureMAV(), FeatureWL()], 4, window, step,
+                                  max_block=80, resync_interval=resync_interval, dtype=dtype)
+
+    decisions = _push_random_blocks(recognizer, x, rng, 80)
+
+    reference = _reference_features(x, window, step)
+    assert len(decisions) == len(reference) == recognizer.windows
+    np.testing.assert_allclose(np.array(pipeline.inputs), reference, rtol=tolerance)
+
+
+def test_push_rejects_oversized_block():
+    recognizer = OnlineRecognizer(LabelSequence(), [FeatureRMS()], 2, 10, 5, max_block=10)
+    with pytest.raises(ValueError):
+        recognizer.push(np.zeros((11, 2)))
+
+
+def test_incremental_feature_is_abstract():
+    with pytest.raises(TypeError):
+        IncrementalFeature()
+
+
+def test_causal_smoothing():
+    labels = [0] * 10 + [2] * 10 + [0] * 2 + [2] * 6 + [0] * 15 + [-1] + [0] * 3
+    recognizer = OnlineRecognizer(LabelSequence(labels), [FeatureRMS()], 1, 4, 4, max_block=4,
+                                  recognition_median_filter=5, min_idle_period=7)
+
+    decisions = np.concatenate([recognizer.push(np.ones((4, 1))).copy() for _ in labels])
+
+    # gesture is reported once median switches, short idle gap keeps it
+    assert np.all(decisions[:12] == 0)
+    assert np.all(decisions[12:28] == 2)
+    # idle is confirmed only after whole opening length of idle medians
+    assert np.all(decisions[28:36] == 2)
+    assert np.all(decisions[36:43] == 0)
+    # negative decisions pass through unfiltered
+    assert decisions[43] == -1
+    assert np.all(decisions[44:] == 0)
+
+
+def test_column_order_from_pipeline():
+    rng = np.random.RandomState(0)
+    columns = ["input_{:d}_{:s}_{:d}".format(i, f, c) for i, (c, f) in
+               enumerate([(c, f) for c in [1, 2] for f in ["MAV", "RMS"]])]
+    X = pd.DataFrame(rng.standard_normal((100, 4)), columns=columns)
+    y = (X["input_1_RMS_1"] > 0).astype(int).values
+    pipeline = prepare_pipeline(X, y, "LDA")
+
+    x = rng.standard_normal((300, 2))
+    recognizer = OnlineRecognizer(pipeline, [FeatureRMS(), FeatureMAV()], 2, 50, 10, max_block=50)
+    np.testing.assert_array_equal(recognizer._order, [2, 0, 3, 1])
+
+    for i in range(0, len(x), 50):
+        recognizer.push(x[i:i + 50])
+    reference = _reference_features(x, 50, 10)
+    np.testing.assert_allclose(recognizer._x[0], reference[-1, [2, 0, 3, 1]], rtol=1e-10)
+    assert np.shares_memory(np.asarray(recognizer._input), recognizer._x)
+    np.testing.assert_allclose(recognizer._input.values[0], reference[-1, [2, 0, 3, 1]], rtol=1e-10)
+    assert list(recognizer._input.columns) == columns
+
+    with pytest.raises(ValueError):
+        OnlineRecognizer(pipeline, [FeatureRMS(), FeatureWL()], 2, 50, 10)
+    with pytest.raises(ValueError):
+        OnlineRecognizer(pipeline, [FeatureRMS(), FeatureMAV(), FeatureWL()], 2, 50, 10)
+
+
+def test_explicit_columns():
+    recognizer = OnlineRecognizer(LabelSequence(), [FeatureRMS(), FeatureMAV()], 2, 10, 5,
+                                  columns=["MAV_8", "RMS_8", "MAV_3", "RMS_3"], channel_numbers=[3, 8])
+    np.testing.assert_array_equal(recognizer._order, [3, 1, 2, 0])
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ..putemg_utilities import CastTransformer, Record, prepare_data, prepare_force_data, prepare_pipeline
+
+
+def _features(rng, n=200, channels=4):
+    columns = ["input_{:d}_{:s}_{:d}".format(f * channels + c, feature, c + 1)
+               for f, feature in enumerate(["RMS", "MAV"]) for c in range(channels)]
+    X = pd.DataFrame(rng.standard_normal((n, len(columns))), columns=columns)
+    y = (X.values[:, 0] + X.values[:, 5] > 0).astype(int)
+    return X, y
+
+
+@pytest.fixture
+def dataframe_append(monkeypatch):
+    # prepare_data and prepare_force_data use DataFrame.append, removed in pandas 2.0
+    if not hasattr(pd.DataFrame, "append"):
+        monkeypatch.setattr(pd.DataFrame, "append", lambda self, other: pd.concat([self, other]), raising=False)
+
+
+def _record_frame(rng, n=50):
+    return pd.DataFrame({"RMS_1": rng.standard_normal(n), "RMS_2": rng.standard_normal(n),
+                         "FORCE_MVC_1": rng.standard_normal(n), "TRAJ_1": np.zeros(n), "type": "emg_gestures",
+                         "subject": "03", "trajectory": "repeats_long", "date_time": "2018-05-11",
+                         "TRAJ_GT": np.repeat([0, 1], n // 2), "VIDEO_STAMP": 0})
+
+
+def test_prepare_pipeline_float32_matches_float64():
+    X, y = _features(np.random.RandomState(0))
+
+    pipe_64 = prepare_pipeline(X, y, "LDA")
+    pipe_32 = prepare_pipeline(X, y, "LDA", dtype=np.float32)
+
+    assert pipe_32[:-1].transform(X).dtype == np.float32
+    assert pipe_64[:-1].transform(X).dtype == np.float64
+    np.testing.assert_allclose(pipe_32[:-1].transform(X), pipe_64[:-1].transform(X), rtol=0, atol=1e-5)
+    assert np.mean(pipe_32.predict(X) == pipe_64.predict(X)) > 0.99
+
+
+def test_prepare_pipeline_default_steps():
+    X, y = _features(np.random.RandomState(0))
+    assert [name for name, _ in prepare_pipeline(X, y, "LDA").steps] == ["scaler", "predictor"]
+    assert [name for name, _ in prepare_pipeline(X, y, "LDA", dtype=np.float32).steps] == \
+        ["dtype", "scaler", "predictor"]
+
+
+def test_cast_transformer_refit_on_array():
+    X, _ = _features(np.random.RandomState(0))
+    cast = CastTransformer(np.float32).fit(X)
+    assert list(cast.feature_names_in_) == list(X.columns)
+    cast.fit(X.values)
+    assert not hasattr(cast, "feature_names_in_")
+    assert cast.transform(X.values).dtype == np.float32
+
+
+def test_prepare_data_float32(dataframe_append):
+    r = Record("emg_gestures-03-repeats_long-2018-05-11-11-05-00-595")
+    df = _record_frame(np.random.RandomState(0))
+
+    data_64 = prepare_data({r: df}, {"train": [r]}, ["RMS"], [0, 1])["train"]
+    data_32 = prepare_data({r: df}, {"train": [r]}, ["RMS"], [0, 1], dtype=np.float32)["train"]
+
+    input_columns = list(data_32.filter(regex="^input_"))
+    assert len(input_columns) == 2
+    assert all(data_32[c].dtype == np.float32 for c in input_columns)
+    np.testing.assert_allclose(data_32[input_columns].values, data_64[input_columns].values, rtol=1e-6)
+
+
+def test_prepare_force_data_float32(dataframe_append):
+    r = Record("emg_force-03-sequential-2018-05-11-11-05-00-595")
+    df = _record_frame(np.random.RandomState(0))
+
+    data_64 = prepare_force_data({r: df}, {"train": [r]}, ["RMS"], "MVC", [1])["train"]
+    data_32 = prepare_force_data({r: df}, {"train": [r]}, ["RMS"], "MVC", [1], dtype=np.float32)["train"]
+
+    assert list(data_32["input"]) == ["RMS_1", "RMS_2"]
+    assert all(data_32["input"].dtypes == np.float32)
+    assert all(data_64["input"].dtypes == np.float64)
+    np.testing.assert_allclose(data_32["input"].values, data_64["input"].values, rtol=1e-6)
+    pd.testing.assert_frame_equal(data_32["output"], data_64["output"])
+    assert list(data_32["output"]) == ["FORCE_MVC_1"]
@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+from .. import record_index
+from ..record_index import RecordIndex, read_xml_metadata
+
+
+RECORD_A = "emg_gestures-03-repeats_long-2018-05-11-11-05-00-595"
+RECORD_B = "emg_gestures-04-sequential-2018-05-12-11-05-00-595"
+
+
+def _touch(path, content="x", mtime_ns=None):
+    with open(path, "w") as f:
+        f.write(content)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    _touch(str(tmp_path / (RECORD_A + ".hdf5")))
+    _touch(str(tmp_path / (RECORD_B + ".hdf5")))
+    _touch(str(tmp_path / "notes.hdf5"))
+    _touch(str(tmp_path / (RECORD_A + ".xml")), "<r><fs>5120.0</fs><l>[1, 2]</l><d>two words</d><e/></r>")
+    return tmp_path
+
+
+def test_read_xml_metadata_keeps_unparsable_strings(dataset):
+    metadata = read_xml_metadata(str(dataset / (RECORD_A + ".xml")))
+    assert metadata == {"fs": 5120.0, "l": [1, 2], "d": "two words", "e": None}
+
+
+def test_update_is_incremental(dataset, tmp_path_factory):
+    index_path = str(tmp_path_factory.mktemp("index") / "index.db")
+    with RecordIndex(index_path) as index:
+        assert index.update(str(dataset)) == 2
+        assert index.update(str(dataset)) == 0
+
+        _touch(str(dataset / (RECORD_B + ".hdf5")), "changed")
+        assert index.update(str(dataset)) == 1
+
+        xml_path = str(dataset / (RECORD_A + ".xml"))
+        _touch(xml_path, "<r><fs>1000.0</fs></r>", mtime_ns=os.stat(xml_path).st_mtime_ns + 10 ** 9)
+        assert index.update(str(dataset)) == 1
+        assert index.metadata(index.records(whitelists={"id": ["03"]})[0]) == {"fs": 1000.0}
+
+    with RecordIndex(index_path) as index:
+        assert index.update(str(dataset)) == 0
+        assert len(index.records()) == 2
+
+
+def test_update_removes_missing_records(dataset, tmp_path_factory):
+    with RecordIndex(str(tmp_path_factory.mktemp("index") / "index.db")) as index:
+        index.update(str(dataset))
+        os.remove(str(dataset / (RECORD_B + ".hdf5")))
+        index.update(str(dataset))
+        assert [str(r) for r in index.records()] == [RECORD_A]
+
+
+def test_update_skips_malformed_metadata(dataset, tmp_path_factory):
+    with RecordIndex(str(tmp_path_factory.mktemp("index") / "index.db")) as index:
+        index.update(str(dataset))
+        xml_path = str(dataset / (RECORD_B + ".xml"))
+        _touch(xml_path, "<r><broken>")
+        with pytest.warns(UserWarning, match="malformed metadata"):
+            assert index.update(str(dataset)) == 0
+        assert [str(r) for r in index.records()] == [RECORD_A]
+
+        _touch(xml_path, "<r><fs>1000.0</fs></r>", mtime_ns=os.stat(xml_path).st_mtime_ns + 10 ** 9)
+        assert index.update(str(dataset)) == 1
+        assert index.metadata(index.records(whitelists={"id": ["04"]})[0]) == {"fs": 1000.0}
+
+
+def test_update_rolls_back_on_error(dataset, tmp_path_factory, monkeypatch):
+    def read_failing(path):
+        raise OSError("read failed")
+
+    with RecordIndex(str(tmp_path_factory.mktemp("index") / "index.db")) as index:
+        monkeypatch.setattr(record_index, "read_xml_metadata", read_failing)
+        with pytest.raises(OSError, match="read failed"):
+            index.update(str(dataset))
+        index.connection.commit()
+        assert index.records() == []
+
+
+def test_records_query(dataset, tmp_path_factory):
+    with RecordIndex(str(tmp_path_factory.mktemp("index") / "index.db")) as index:
+        index.update(str(dataset))
+
+        records = index.records(whitelists={"id": ["03"]})
+        assert [str(r) for r in records] == [RECORD_A]
+        assert records[0].path == os.path.join(str(dataset), RECORD_A + ".hdf5")
+        assert index.metadata(records[0])["d"] == "two words"
+
+        assert [str(r) for r in index.records(blacklists={"trajectory": ["repeats_long"]})] == [RECORD_B]
+        assert [str(r) for r in index.records(whitelists={"date": ["2018-05-12"]})] == [RECORD_B]
+        assert index.metadata(index.records(whitelists={"id": ["04"]})[0]) is None
+
+        with pytest.raises(ValueError):
+            index.records(whitelists={"subject": ["03"]})
+
+
+def test_metadata_is_not_unpickled(tmp_path):
+    index_path = str(tmp_path / "index.db")
+    with RecordIndex(index_path) as index:
+        index.connection.execute("INSERT INTO records (path, metadata) VALUES (?, ?)",
+                                 ("/data/" + RECORD_A + ".hdf5", "__import__('os').system('false')"))
+        index.connection.commit()
+        with pytest.raises(ValueError):
+            index.metadata(index.records()[0])